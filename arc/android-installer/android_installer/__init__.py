@@ -8,12 +8,8 @@ This script will be called by push_to_device, chromeos-base/android-{container,
 vm}-* ebuilds and board_specific_setup.
 """
 
-from __future__ import print_function
-
-import argparse
 import enum
-import sys
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 
 class AndroidInstallerCaller(enum.Enum):
@@ -26,15 +22,110 @@ class AndroidInstallerCaller(enum.Enum):
   BOARD_SPECIFIC_SETUP_TEST = 5
 
   @staticmethod
-  def allowed_callers() -> List[str]:
-    return [name.lower() for name in
-            AndroidInstallerCaller.__members__.keys()]
+  def allowed_callers() -> Tuple[str, ...]:
+    return _ALLOWED_CALLERS
 
   @staticmethod
-  # TODO(boleynsu): annotate the return type once we are using python>3.6
-  def from_str(caller: str):
-    return AndroidInstallerCaller[caller.upper()]
-
+  def from_str(caller: str) -> 'AndroidInstallerCaller':
+    member = _CALLERS_BY_NAME.get(caller)
+    if member is None:
+      # Not one of the allowed (lowercase) names; fall back to a
+      # case-insensitive lookup, which raises KeyError if it is invalid.
+      member = AndroidInstallerCaller[caller.upper()]
+    return member
+
+
+# The lowercase names of all callers; these never change, so compute them once.
+_ALLOWED_CALLERS = tuple(name.lower() for name in
+                         AndroidInstallerCaller.__members__.keys())
+# Maps each allowed caller name back to its AndroidInstallerCaller.
+_CALLERS_BY_NAME = {caller.name.lower(): caller
+                    for caller in AndroidInstallerCaller}
+
+# Maps the leading character of a --use argument to the flag value.
+_USE_FLAG_SIGNS = {'+': True, '-': False}
+
+# The AndroidInstaller methods run by main() for each caller, in order.
+_MAIN_STEPS = {
+    AndroidInstallerCaller.PUSH_TO_DEVICE: (
+        'ebuild_src_compile',
+        'ebuild_src_test',
+        'ebuild_src_install',
+        'board_specific_setup',
+        'board_specific_setup_test',
+    ),
+    AndroidInstallerCaller.EBUILD_SRC_COMPILE: ('ebuild_src_compile',),
+    AndroidInstallerCaller.EBUILD_SRC_INSTALL: ('ebuild_src_install',),
+    AndroidInstallerCaller.EBUILD_SRC_TEST: ('ebuild_src_test',),
+    AndroidInstallerCaller.BOARD_SPECIFIC_SETUP: ('board_specific_setup',),
+    AndroidInstallerCaller.BOARD_SPECIFIC_SETUP_TEST: (
+        'board_specific_setup_test',),
+}
+
+
+def _parse_args_with_argparse(
+    argv: List[str]) -> Tuple[List[str], List[str], Optional[str]]:
+  """Parse the arguments with argparse, which handles --help and errors."""
+  # Only needed here; import lazily to keep importing this module cheap.
+  import argparse  # pylint: disable=import-outside-toplevel
+
+  parser = argparse.ArgumentParser(
+      usage=
+      """
+      Example:
+        %(prog)s --env=ROOT=/build/rammus-arc-r --use=-cheets_local_img \\
+          --caller push_to_device
+
+        %(prog)s --env ROOT=/build/rammus-arc-r --env PV=9999 \\
+          --env KEY_WITH_NO_VALUE= --use +cheets_local_img \\
+          --use +chromeos-base/chromeos-cheets:android-container-pi \\
+          --caller ebuild_src_compile
+      Note:
+        The dash used in --use is special so we must use --use=-use_flag
+        instead of --use -use_flag
+      """
+  )
+  parser.add_argument('--env', action='append',
+                      help='the format is KEY=VALUE')
+  parser.add_argument('--use', action='append',
+                      help='the format is +use_flag or -use_flag')
+  parser.add_argument(
+      '--caller', choices=AndroidInstallerCaller.allowed_callers(),
+      help='the caller of this script')
+
+  args = parser.parse_args(args=argv)
+  return args.env or [], args.use or [], args.caller
+
+
+def _parse_args(argv: List[str]) -> Tuple[List[str], List[str], Optional[str]]:
+  """Parse the arguments into the --env values, --use values and caller.
+
+  The command line only has three kinds of options, so the common case is
+  tokenized by hand. Anything else (--help, unknown options, missing values or
+  an invalid caller) is handed over to argparse, which either accepts it or
+  reports the error.
+  """
+  values = {'--env': [], '--use': [], '--caller': []}
+  i = 0
+  while i < len(argv):
+    name, sep, value = argv[i].partition('=')
+    i += 1
+    option_values = values.get(name)
+    if option_values is None:
+      return _parse_args_with_argparse(argv)
+    if not sep:
+      # The value is the next argument, which argparse refuses to take if it
+      # looks like an option.
+      if i == len(argv) or argv[i].startswith('-'):
+        return _parse_args_with_argparse(argv)
+      value = argv[i]
+      i += 1
+    option_values.append(value)
+
+  callers = values['--caller']
+  if any(c not in _ALLOWED_CALLERS for c in callers):
+    return _parse_args_with_argparse(argv)
+  return values['--env'], values['--use'], callers[-1] if callers else None
 
 
 class AndroidInstaller:
@@ -49,42 +140,16 @@ class AndroidInstaller:
 
   def __init__(self, argv: List[str]) -> None:
     """Parse the arguments."""
+    env_args, use_args, caller = _parse_args(argv)
 
-    parser = argparse.ArgumentParser(
-        usage=
-        """
-        Example:
-          %(prog)s --env=ROOT=/build/rammus-arc-r --use=-cheets_local_img \\
-            --caller push_to_device
-
-          %(prog)s --env ROOT=/build/rammus-arc-r --env PV=9999 \\
-            --env KEY_WITH_NO_VALUE= --use +cheets_local_img \\
-            --use +chromeos-base/chromeos-cheets:android-container-pi \\
-            --caller ebuild_src_compile
-        Note:
-          The dash used in --use is special so we must use --use=-use_flag
-          instead of --use -use_flag
-        """
-    )
-    parser.add_argument('--env', action='append',
-                        help='the format is KEY=VALUE')
-    parser.add_argument('--use', action='append',
-                        help='the format is +use_flag or -use_flag')
-    parser.add_argument(
-        '--caller', choices=AndroidInstallerCaller.allowed_callers(),
-        help='the caller of this script')
-
-    args = parser.parse_args(args=argv)
-
-    self.env = dict()
-    if args.env:
-      for e in args.env:
-        kv = e.split('=', 1)
-        if len(kv) < 2:
+    self.env = {}
+    if env_args:
+      for e in env_args:
+        key, sep, value = e.partition('=')
+        if not sep:
           raise ValueError(
               'Invalid --env %s argument.' % e +
               ' = is missing. For a key with no value, please use --env KEY=')
-        key, value = kv
         if not key:
           raise ValueError(
               'Invalid --env %s argument.' % e +
@@ -92,41 +157,24 @@ class AndroidInstaller:
         # The later argument will overwrite the former one.
         self.env[key] = value
 
-    self.use = dict()
-    if args.use:
-      for u in args.use:
-        key = u[1:]
-        if u[0] == '+':
-          value = True
-        elif u[0] == '-':
-          value = False
-        else:
+    self.use = {}
+    if use_args:
+      for u in use_args:
+        value = _USE_FLAG_SIGNS.get(u[:1])
+        if value is None:
           raise ValueError(
               'Invalid --use %s argument.' % u +
               ' The first character should be + or -.')
         # The later argument will overwrite the former one.
-        self.use[key] = value
+        self.use[u[1:]] = value
 
-    if not args.caller:
+    if not caller:
       raise ValueError('--caller must be specified')
-    self.caller = AndroidInstallerCaller.from_str(args.caller)
+    self.caller = AndroidInstallerCaller.from_str(caller)
 
   def main(self) -> None:
-    if self.caller in [AndroidInstallerCaller.PUSH_TO_DEVICE,
-                       AndroidInstallerCaller.EBUILD_SRC_COMPILE]:
-      self.ebuild_src_compile()
-    if self.caller in [AndroidInstallerCaller.PUSH_TO_DEVICE,
-                       AndroidInstallerCaller.EBUILD_SRC_TEST]:
-      self.ebuild_src_test()
-    if self.caller in [AndroidInstallerCaller.PUSH_TO_DEVICE,
-                       AndroidInstallerCaller.EBUILD_SRC_INSTALL]:
-      self.ebuild_src_install()
-    if self.caller in [AndroidInstallerCaller.PUSH_TO_DEVICE,
-                       AndroidInstallerCaller.BOARD_SPECIFIC_SETUP]:
-      self.board_specific_setup()
-    if self.caller in [AndroidInstallerCaller.PUSH_TO_DEVICE,
-                       AndroidInstallerCaller.BOARD_SPECIFIC_SETUP_TEST]:
-      self.board_specific_setup_test()
+    for step in _MAIN_STEPS[self.caller]:
+      getattr(self, step)()
 
   def ebuild_src_compile(self) -> None:
     pass
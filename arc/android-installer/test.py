@@ -75,19 +75,52 @@ class AndroidInstallerTest(unittest.TestCase):
     self.assertRaises(ValueError, lambda: android_installer.AndroidInstaller(
         []))
 
+  def test_parse_args(self):
+    # Test the --option=value forms
+    installer = android_installer.AndroidInstaller(
+        ['--env=a=b=c', '--caller=ebuild_src_compile'])
+    self.assertEqual(installer.env, {'a': 'b=c'})
+    self.assertEqual(
+        installer.caller,
+        android_installer.AndroidInstallerCaller.EBUILD_SRC_COMPILE)
+
+    # Test that anything the fast path does not handle goes to argparse
+    # pylint: disable=protected-access
+    with unittest.mock.patch.object(
+        android_installer, '_parse_args_with_argparse',
+        wraps=android_installer._parse_args_with_argparse) as fallback:
+      # Test an unknown option
+      self.assertRaises(SystemExit, lambda: android_installer.AndroidInstaller(
+          ['--unknown', 'x', '--caller', 'ebuild_src_compile']))
+      fallback.assert_called_once()
+      fallback.reset_mock()
+      # Test an abbreviated option, which argparse accepts
+      self.assertEqual(
+          android_installer.AndroidInstaller(
+              ['--call', 'ebuild_src_compile']).caller,
+          android_installer.AndroidInstallerCaller.EBUILD_SRC_COMPILE)
+      fallback.assert_called_once()
+
+    # Test --env with no value
+    self.assertRaises(SystemExit, lambda: android_installer.AndroidInstaller(
+        ['--caller', 'ebuild_src_compile', '--env']))
+    # Test --use with a value that looks like an option
+    self.assertRaises(SystemExit, lambda: android_installer.AndroidInstaller(
+        ['--use', '-x', '--caller', 'ebuild_src_compile']))
+
   def test_main(self):
-    all_fn = ['ebuild_src_compile', 'ebuild_src_install', 'ebuild_src_test',
-              'board_specific_setup', 'board_specific_setup_test']
+    all_fn = frozenset({'ebuild_src_compile', 'ebuild_src_install',
+                        'ebuild_src_test', 'board_specific_setup',
+                        'board_specific_setup_test'})
 
     def test_called(caller, called_fn):
       mock = unittest.mock.Mock(android_installer.AndroidInstaller)
       mock.caller = android_installer.AndroidInstallerCaller.from_str(caller)
       android_installer.AndroidInstaller.main(mock)
-      for fn in all_fn:
-        if fn in called_fn:
-          mock.__getattr__(fn).assert_called_once()
-        else:
-          mock.__getattr__(fn).assert_not_called()
+      for fn in called_fn:
+        getattr(mock, fn).assert_called_once()
+      for fn in all_fn.difference(called_fn):
+        getattr(mock, fn).assert_not_called()
 
     for caller in android_installer.AndroidInstallerCaller.allowed_callers():
       if caller != 'push_to_device':
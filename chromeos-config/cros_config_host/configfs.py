@@ -20,6 +20,12 @@ HEADER_FORMAT = '<LLL4x'
 # flags, model match, sku match, whitelabel match
 ENTRY_FORMAT = '<LLLL'
 
+_HEADER_STRUCT = struct.Struct(HEADER_FORMAT)
+_ENTRY_STRUCT = struct.Struct(ENTRY_FORMAT)
+
+# Shared stand-in for device configs without an identity.  Never modified.
+_EMPTY_IDENTITY = {}
+
 
 class IdentityType(enum.Enum):
   """The type of identity provided by the identity data file."""
@@ -54,6 +60,10 @@ def Serialize(obj):
   Returns:
     The bytes representation of the object suitable for dumping into a file.
   """
+  # Nearly all config leaves are plain strings, so check for them first; this
+  # skips the isinstance checks below, which only bytes and bool need.
+  if type(obj) is str:  # pylint: disable=unidiomatic-typecheck
+    return obj.encode('utf-8')
   if isinstance(obj, bytes):
     return obj
   if isinstance(obj, bool):
@@ -69,20 +79,27 @@ def WriteConfigFSFiles(config, base_path):
     base_path: The path to write out to.
   """
   if isinstance(config, dict):
-    iterator = config.items()
+    # The parent directory has always been created already, either by
+    # the caller or by the previous level of recursion.
+    os.mkdir(base_path, mode=0o755)
+    prefix = base_path + '/'
+    for name, entry in config.items():
+      WriteConfigFSFiles(entry, prefix + name)
   elif isinstance(config, list):
-    iterator = enumerate(config)
-  else:
-    iterator = None
-
-  if iterator is not None:
-    os.makedirs(base_path, mode=0o755)
-    for name, entry in iterator:
-      path = os.path.join(base_path, str(name))
-      WriteConfigFSFiles(entry, path)
+    os.mkdir(base_path, mode=0o755)
+    prefix = base_path + '/'
+    for i, entry in enumerate(config):
+      WriteConfigFSFiles(entry, prefix + str(i))
   else:
-    with open(os.open(base_path, os.O_CREAT | os.O_WRONLY, 0o644), 'wb') as f:
-      f.write(Serialize(config))
+    # Leaf payloads are tiny, so write them straight to the file
+    # descriptor rather than through a buffered file object.
+    data = memoryview(Serialize(config))
+    fd = os.open(base_path, os.O_CREAT | os.O_WRONLY, 0o644)
+    try:
+      while data:
+        data = data[os.write(fd, data):]
+    finally:
+      os.close(fd)
 
 
 def WriteIdentityJson(config, output_file):
@@ -97,11 +114,37 @@ def WriteIdentityJson(config, output_file):
     config: The configuration dictionary (containing "chromeos").
     output_file: A file-like object to write to.
   """
-  minified_configs = []
-  minified_config = {'chromeos': {'configs': minified_configs}}
-  for device_config in config['chromeos']['configs']:
-    minified_configs.append({'identity': device_config['identity']})
-  json.dump(minified_config, output_file)
+  # Stream out {"chromeos": {"configs": [{"identity": ...}, ...]}} one
+  # config at a time rather than building the minified config first.
+  iterencode = json.JSONEncoder(separators=(',', ':')).iterencode
+  output_file.write('{"chromeos":{"configs":[')
+  for i, device_config in enumerate(config['chromeos']['configs']):
+    if i:
+      output_file.write(',')
+    for chunk in iterencode({'identity': device_config['identity']}):
+      output_file.write(chunk)
+  output_file.write(']}}')
+
+
+def _HasArmIdentity(identities):
+  """Check whether the identities are for ARM devices rather than x86.
+
+  Detecting x86 vs. ARM is rather annoying given the JSON-like schema.
+  This implementation checks if any identity dict contains a
+  device-tree-compatible-match or firmware-name, stopping at the first
+  one that does.
+
+  Args:
+    identities: The identity dicts of all device configs.
+
+  Returns:
+    True if the identity type is ARM, False if it is X86.
+  """
+  for identity_info in identities:
+    if identity_info and ('device-tree-compatible-match' in identity_info
+                          or 'firmware-name' in identity_info):
+      return True
+  return False
 
 
 def WriteIdentityStruct(config, output_file):
@@ -116,46 +159,42 @@ def WriteIdentityStruct(config, output_file):
     output_file: A file-like object to write to, opened in binary mode.
   """
   device_configs = config['chromeos']['configs']
-  string_table = []
+  # Maps each encoded string to its byte offset from the base of the
+  # string table.  Insertion order is the order strings are written.
+  string_table = {}
+  next_offset = 0
+  # Maps each raw string to its encoded form, as the same strings are
+  # commonly shared by many device configs.
+  encoded_strings = {}
 
   # Add a string to the table if it does to exist. Return the number
   # of bytes offset the string will live from the base of the string
   # table.
   def _StringTableIndex(string):
+    nonlocal next_offset
     if string is None:
       return 0
 
-    string = string.lower()
-    string = string.encode('utf-8') + b'\000'
-    if string not in string_table:
-      string_table.append(string)
-
-    index = 0
-    for entry in string_table:
-      if entry == string:
-        return index
-      index += len(entry)
-
-  # Detecting x86 vs. ARM is rather annoying given the JSON-like
-  # schema.  This implementation checks if any config has an identity
-  # dict containing a device-tree-compatible-match or firmware-name,
-  # and correspondingly sets the identity type to ARM, otherwise X86.
-  if any('device-tree-compatible-match' in c.get('identity', {})
-         or 'firmware-name' in c.get('identity', {})
-         for c in device_configs):
+    encoded = encoded_strings.get(string)
+    if encoded is None:
+      encoded = string.lower().encode('utf-8') + b'\000'
+      encoded_strings[string] = encoded
+    index = string_table.get(encoded)
+    if index is None:
+      index = next_offset
+      string_table[encoded] = index
+      next_offset += len(encoded)
+    return index
+
+  identities = [c.get('identity') or _EMPTY_IDENTITY for c in device_configs]
+  if _HasArmIdentity(identities):
     identity_type = IdentityType.ARM
   else:
     identity_type = IdentityType.X86
 
-  # Write the header of the struct, containing version and identity
-  # type (x86 vs. ARM).
-  output_file.write(
-      struct.pack(HEADER_FORMAT, STRUCT_VERSION, identity_type.value,
-                  len(device_configs)))
-
-  # Write each of the entry structs.
-  for device_config in device_configs:
-    identity_info = device_config.get('identity', {})
+  # Compute the fields of each of the entry structs.
+  rows = []
+  for identity_info in identities:
     flags = 0
     sku_id = 0
     if 'sku-id' in identity_info:
@@ -182,15 +221,28 @@ def WriteIdentityStruct(config, output_file):
       flags |= EntryFlags.HAS_WHITELABEL.value
       whitelabel_match = identity_info['whitelabel-tag']
 
-    output_file.write(
-        struct.pack(ENTRY_FORMAT,
-                    flags,
-                    _StringTableIndex(model_match),
-                    sku_id,
-                    _StringTableIndex(whitelabel_match)))
-
-  for entry in string_table:
-    output_file.write(entry)
+    rows.append((flags, model_match, sku_id, whitelabel_match))
+
+  # Lay out the string table, replacing each string with its offset.
+  entries = [(flags,
+              _StringTableIndex(model_match),
+              sku_id,
+              _StringTableIndex(whitelabel_match))
+             for flags, model_match, sku_id, whitelabel_match in rows]
+
+  # Pack the header (containing version and identity type), the
+  # entries, and the string table into a single buffer, and write it
+  # out all at once.
+  buf = bytearray(_HEADER_STRUCT.size + _ENTRY_STRUCT.size * len(entries)
+                  + next_offset)
+  _HEADER_STRUCT.pack_into(buf, 0, STRUCT_VERSION, identity_type.value,
+                           len(device_configs))
+  offset = _HEADER_STRUCT.size
+  for entry in entries:
+    _ENTRY_STRUCT.pack_into(buf, offset, *entry)
+    offset += _ENTRY_STRUCT.size
+  buf[offset:] = b''.join(string_table)
+  output_file.write(buf)
 
 
 def GenerateConfigFSData(config, output_fs):
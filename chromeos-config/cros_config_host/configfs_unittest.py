@@ -9,9 +9,11 @@
 
 from __future__ import print_function
 
+import atexit
 import functools
 import json
 import os
+import shutil
 import struct
 import subprocess
 import tempfile
@@ -22,6 +24,44 @@ from chromite.lib import osutils
 
 this_dir = os.path.dirname(__file__)
 
+_HEADER_STRUCT = struct.Struct(configfs.HEADER_FORMAT)
+_ENTRY_STRUCT = struct.Struct(configfs.ENTRY_FORMAT)
+
+# Keep the generated images in memory when possible; they are small and
+# only live for the duration of the tests.
+_TMPFS_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Maps test config file names to (config, output_dir) tuples, so that
+# each ConfigFS image is only generated and extracted once per run.
+_GENERATED_CONFIGS = {}
+
+
+def _GenerateTestConfigFS(filename):
+  """Generate and extract the ConfigFS image for a test config.
+
+  The results are shared by all tests, which must not modify them.
+
+  Args:
+    filename: The name of the config file in test_data/.
+
+  Returns:
+    A (config, output_dir) tuple, where output_dir contains the image
+    and its extracted squashfs-root.
+  """
+  result = _GENERATED_CONFIGS.get(filename)
+  if result is None:
+    with open(os.path.join(this_dir, '../test_data', filename)) as f:
+      config = json.load(f)
+
+    output_dir = tempfile.mkdtemp(prefix='test.', dir=_TMPFS_DIR)
+    atexit.register(shutil.rmtree, output_dir)
+    squashfs_img = os.path.join(output_dir, 'configfs.img')
+    configfs.GenerateConfigFSData(config, squashfs_img)
+    subprocess.run(['unsquashfs', '-no-xattrs', '-no-progress', squashfs_img],
+                   check=True, cwd=output_dir, stdout=subprocess.PIPE)
+    result = _GENERATED_CONFIGS[filename] = (config, output_dir)
+  return result
+
 
 def TestConfigs(*args):
   """Wrapper function for tests which use configs from libcros_config/
@@ -36,15 +76,8 @@ def TestConfigs(*args):
     @functools.wraps(method)
     def _Wrapper(self):
       for filename in args:
-        with open(os.path.join(this_dir, '../test_data', filename)) as f:
-          config = json.load(f)
-
-        with tempfile.TemporaryDirectory(prefix='test.') as output_dir:
-          squashfs_img = os.path.join(output_dir, 'configfs.img')
-          configfs.GenerateConfigFSData(config, squashfs_img)
-          subprocess.run(['unsquashfs', squashfs_img], check=True,
-                         cwd=output_dir, stdout=subprocess.PIPE)
-          method(self, filename, config, output_dir)
+        config, output_dir = _GenerateTestConfigFS(filename)
+        method(self, filename, config, output_dir)
     return _Wrapper
   return _Decorator
 
@@ -61,21 +94,22 @@ class ConfigFSTests(cros_test_lib.TestCase):
 
   @TestConfigs('test.json', 'test_arm.json')
   def testConfigV1FileStructure(self, filename, config, output_dir):
-    def _CheckConfigRec(config, path):
-      if isinstance(config, dict):
-        iterator = config.items()
-      elif isinstance(config, list):
-        iterator = enumerate(config)
+    # Walk the config with an explicit stack of (config, path) pairs.
+    stack = [(config, os.path.join(output_dir, 'squashfs-root/v1'))]
+    while stack:
+      node, path = stack.pop()
+      if isinstance(node, dict):
+        iterator = node.items()
+      elif isinstance(node, list):
+        iterator = enumerate(node)
       else:
         self.assertTrue(os.path.isfile(path))
         self.assertEqual(osutils.ReadFile(path, mode='rb'),
-                         configfs.Serialize(config))
-        return
+                         configfs.Serialize(node))
+        continue
       self.assertTrue(os.path.isdir(path))
-      for name, entry in iterator:
-        childpath = os.path.join(path, str(name))
-        _CheckConfigRec(entry, childpath)
-    _CheckConfigRec(config, os.path.join(output_dir, 'squashfs-root/v1'))
+      stack.extend((entry, os.path.join(path, str(name)))
+                   for name, entry in iterator)
 
   # TODO(jrosenth): remove once we've fully moved over to struct-based
   # identity.
@@ -99,9 +133,8 @@ class ConfigFSTests(cros_test_lib.TestCase):
     device_configs = config['chromeos']['configs']
     identity_path = os.path.join(output_dir, 'squashfs-root/identity.bin')
     identity_bin = osutils.ReadFile(identity_path, mode='rb')
-    version, identity_type, entry_count = struct.unpack_from(
-        configfs.HEADER_FORMAT, identity_bin)
-    offset = struct.calcsize(configfs.HEADER_FORMAT)
+    version, identity_type, entry_count = _HEADER_STRUCT.unpack_from(
+        identity_bin)
     identity_type = configfs.IdentityType(identity_type)
 
     self.assertEqual(version, configfs.STRUCT_VERSION)
@@ -111,67 +144,71 @@ class ConfigFSTests(cros_test_lib.TestCase):
       self.assertEqual(identity_type, configfs.IdentityType.X86)
     self.assertEqual(len(device_configs), entry_count)
 
+    # The string table starts right after the entries.
+    base = _HEADER_STRUCT.size + _ENTRY_STRUCT.size * entry_count
+
     # Get an entry from the string table.
     def _GetString(offset):
-      base = (struct.calcsize(configfs.HEADER_FORMAT)
-              + struct.calcsize(configfs.ENTRY_FORMAT) * entry_count)
-      string, _, _ = identity_bin[base + offset:].partition(b'\000')
-      return string.decode('utf-8')
-
-    for device in device_configs:
-      flags, model_match_offset, sku_id, whitelabel_offset = struct.unpack_from(
-          configfs.ENTRY_FORMAT, identity_bin, offset=offset)
-      offset += struct.calcsize(configfs.ENTRY_FORMAT)
+      start = base + offset
+      end = identity_bin.index(b'\000', start)
+      return identity_bin[start:end].decode('utf-8')
+
+    entries = _ENTRY_STRUCT.iter_unpack(
+        memoryview(identity_bin)[_HEADER_STRUCT.size:base])
+    for device, (flags, model_match_offset, sku_id,
+                 whitelabel_offset) in zip(device_configs, entries):
+      # String matches are stored lowercased, so lowercase them up front.
+      identity = {k: v.lower() if isinstance(v, str) else v
+                  for k, v in device['identity'].items()}
 
       if identity_type == configfs.IdentityType.X86:
         self.assertEqual(
             flags & configfs.EntryFlags.USES_FIRMWARE_NAME.value, 0)
 
-      if 'smbios-name-match' in device['identity']:
+      if 'smbios-name-match' in identity:
         self.assertEqual(flags & configfs.EntryFlags.HAS_SMBIOS_NAME.value,
                          configfs.EntryFlags.HAS_SMBIOS_NAME.value)
         self.assertEqual(identity_type, configfs.IdentityType.X86)
         self.assertEqual(_GetString(model_match_offset),
-                         device['identity']['smbios-name-match'].lower())
+                         identity['smbios-name-match'])
 
-      if 'device-tree-compatible-match' in device['identity']:
+      if 'device-tree-compatible-match' in identity:
         self.assertEqual(identity_type, configfs.IdentityType.ARM)
-        self.assertEqual(
-            _GetString(model_match_offset),
-            device['identity']['device-tree-compatible-match'].lower())
+        self.assertEqual(_GetString(model_match_offset),
+                         identity['device-tree-compatible-match'])
 
-      if 'firmware-name' in device['identity']:
+      if 'firmware-name' in identity:
         self.assertEqual(flags & configfs.EntryFlags.USES_FIRMWARE_NAME.value,
                          configfs.EntryFlags.USES_FIRMWARE_NAME.value)
         self.assertEqual(identity_type, configfs.IdentityType.ARM)
         self.assertEqual(_GetString(model_match_offset),
-                         device['identity']['firmware-name'].lower())
+                         identity['firmware-name'])
       else:
         self.assertEqual(
             flags & configfs.EntryFlags.USES_FIRMWARE_NAME.value, 0)
 
-      if 'sku-id' in device['identity']:
+      if 'sku-id' in identity:
         self.assertEqual(flags & configfs.EntryFlags.HAS_SKU_ID.value,
                          configfs.EntryFlags.HAS_SKU_ID.value)
-        self.assertEqual(sku_id, device['identity']['sku-id'])
+        self.assertEqual(sku_id, identity['sku-id'])
       else:
         self.assertEqual(flags & configfs.EntryFlags.HAS_SKU_ID.value, 0)
 
-      if 'whitelabel-tag' in device['identity']:
+      if 'whitelabel-tag' in identity:
         self.assertEqual(flags & configfs.EntryFlags.HAS_WHITELABEL.value,
                          configfs.EntryFlags.HAS_WHITELABEL.value)
         self.assertEqual(_GetString(whitelabel_offset),
-                         device['identity']['whitelabel-tag'].lower())
+                         identity['whitelabel-tag'])
       else:
         self.assertEqual(
             flags & configfs.EntryFlags.HAS_WHITELABEL.value, 0)
 
-      if 'customization-id' in device['identity']:
+      if 'customization-id' in identity:
         self.assertEqual(
             flags & configfs.EntryFlags.USES_CUSTOMIZATION_ID.value,
             configfs.EntryFlags.USES_CUSTOMIZATION_ID.value)
         self.assertEqual(_GetString(whitelabel_offset),
-                         device['identity']['customization-id'].lower())
+                         identity['customization-id'])
       else:
         self.assertEqual(
             flags & configfs.EntryFlags.USES_CUSTOMIZATION_ID.value, 0)
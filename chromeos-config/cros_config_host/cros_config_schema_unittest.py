@@ -6,25 +6,45 @@
 
 # pylint: disable=module-missing-docstring,class-missing-docstring
 
-from __future__ import print_function
-
+import difflib
+import filecmp
+import functools
+from itertools import zip_longest
 import json
 import os
 import re
+import shutil
+import tempfile
 import textwrap
 
 import jsonschema  # pylint: disable=import-error
-from six.moves import zip_longest
-import yaml  # pylint: disable=import-error
 from packaging import version  # pylint: disable=import-error
 
 import cros_config_schema
 import libcros_schema
 
 from chromite.lib import cros_test_lib
+from chromite.lib import osutils
 
 this_dir = os.path.dirname(__file__)
 
+# The schema (with its imports applied) is the same for every test class, so
+# only read it once.
+_ReadSchema = functools.lru_cache(maxsize=1)(cros_config_schema.ReadSchema)
+
+
+def _GetNamedTuple(json_config):
+  """Parses transformed JSON into named tuples."""
+  return libcros_schema.GetNamedTuple(json.loads(json_config))
+
+
+# Pattern for stripping cras-config-dir out of BASIC_CONFIG.
+_CRAS_CONFIG_DIR_RE = re.compile(r' *cras-config-dir: .*')
+
+_FINGERPRINT_RO_VERSIONS_RE = re.compile(
+    'You may not use different fingerprint firmware RO versions on the '
+    'same board:.*')
+
 BASIC_CONFIG = """
 reef-9042-fw: &reef-9042-fw
   bcs-overlay: 'overlay-reef-private'
@@ -65,6 +85,9 @@ chromeos:
             test-label: 'reef'
 """
 
+# BASIC_CONFIG never changes, so only transform it once.
+_BASIC_TRANSFORMED_JSON = cros_config_schema.TransformConfig(BASIC_CONFIG)
+
 
 class MergeDictionaries(cros_test_lib.TestCase):
 
@@ -101,10 +124,9 @@ class ParseArgsTests(cros_test_lib.TestCase):
 class TransformConfigTests(cros_test_lib.TestCase):
 
   def testBasicTransform(self):
-    result = cros_config_schema.TransformConfig(BASIC_CONFIG)
-    json_dict = json.loads(result)
-    self.assertEqual(len(json_dict), 1)
-    json_obj = libcros_schema.GetNamedTuple(json_dict)
+    result = _BASIC_TRANSFORMED_JSON
+    json_obj = _GetNamedTuple(result)
+    self.assertEqual(len(json_obj), 1)
     self.assertEqual(1, len(json_obj.chromeos.configs))
     model = json_obj.chromeos.configs[0]
     self.assertEqual('basking', model.name)
@@ -116,8 +138,7 @@ class TransformConfigTests(cros_test_lib.TestCase):
   def testTransformConfig_NoMatch(self):
     result = cros_config_schema.TransformConfig(
         BASIC_CONFIG, model_filter_regex='abc123')
-    json_dict = json.loads(result)
-    json_obj = libcros_schema.GetNamedTuple(json_dict)
+    json_obj = _GetNamedTuple(result)
     self.assertEqual(0, len(json_obj.chromeos.configs))
 
   def testTransformConfig_FilterMatch(self):
@@ -167,8 +188,7 @@ chromeos:
 
     result = cros_config_schema.TransformConfig(
         scoped_config, model_filter_regex='bar')
-    json_dict = json.loads(result)
-    json_obj = libcros_schema.GetNamedTuple(json_dict)
+    json_obj = _GetNamedTuple(result)
     self.assertEqual(1, len(json_obj.chromeos.configs))
     model = json_obj.chromeos.configs[0]
     self.assertEqual('bar', model.name)
@@ -202,8 +222,7 @@ chromeos:
               no-firmware: True
 """
     result = cros_config_schema.TransformConfig(scoped_config)
-    json_dict = json.loads(result)
-    json_obj = libcros_schema.GetNamedTuple(json_dict)
+    json_obj = _GetNamedTuple(result)
     config = json_obj.chromeos.configs[0]
     self.assertEqual(
         'overridden-by-product-scope', config.audio.main.cras_config_dir)
@@ -213,31 +232,33 @@ chromeos:
 
 class ValidateConfigSchemaTests(cros_test_lib.TestCase):
 
-  def setUp(self):
-    self._schema = cros_config_schema.ReadSchema()
+  @classmethod
+  def setUpClass(cls):
+    super().setUpClass()
+    cls._schema = _ReadSchema()
 
   def testBasicSchemaValidation(self):
     libcros_schema.ValidateConfigSchema(
-        self._schema, cros_config_schema.TransformConfig(BASIC_CONFIG))
+        self._schema, _BASIC_TRANSFORMED_JSON)
 
   def testMissingRequiredElement(self):
-    config = re.sub(r' *cras-config-dir: .*', '', BASIC_CONFIG)
-    config = re.sub(r' *volume: .*', '', BASIC_CONFIG)
-    try:
+    # $dsp-ini refers to cras-config-dir, so drop that reference too, or
+    # TransformConfig fails before the schema is checked.
+    config = _CRAS_CONFIG_DIR_RE.sub('', BASIC_CONFIG).replace(
+        '{{cras-config-dir}}/dsp.ini', 'dsp.ini')
+    with self.assertRaises(jsonschema.ValidationError) as ctx:
       libcros_schema.ValidateConfigSchema(
           self._schema, cros_config_schema.TransformConfig(config))
-    except jsonschema.ValidationError as err:
-      self.assertIn('required', err.__str__())
-      self.assertIn('cras-config-dir', err.__str__())
+    self.assertIn('required', ctx.exception.message)
+    self.assertIn('cras-config-dir', ctx.exception.message)
 
   def testReferencedNonExistentTemplateVariable(self):
-    config = re.sub(r' *$card: .*', '', BASIC_CONFIG)
-    try:
+    config = _CRAS_CONFIG_DIR_RE.sub('', BASIC_CONFIG)
+    with self.assertRaises(cros_config_schema.ValidationError) as ctx:
       libcros_schema.ValidateConfigSchema(
           self._schema, cros_config_schema.TransformConfig(config))
-    except cros_config_schema.ValidationError as err:
-      self.assertIn('Referenced template variable', err.__str__())
-      self.assertIn('cras-config-dir', err.__str__())
+    self.assertIn('Referenced template variable', str(ctx.exception))
+    self.assertIn('cras-config-dir', str(ctx.exception))
 
   def testSkuIdOutOfBound(self):
     config = BASIC_CONFIG.replace('$sku-id: 0', '$sku-id: 0x80000000')
@@ -255,8 +276,10 @@ class ValidateConfigSchemaTests(cros_test_lib.TestCase):
 
 class ValidateFingerprintSchema(cros_test_lib.TestCase):
 
-  def setUp(self):
-    self._schema = cros_config_schema.ReadSchema()
+  @classmethod
+  def setUpClass(cls):
+    super().setUpClass()
+    cls._schema = _ReadSchema()
 
   def testROVersion(self):
     config = {
@@ -299,8 +322,10 @@ class ValidateFingerprintSchema(cros_test_lib.TestCase):
 
 class ValidateCameraSchema(cros_test_lib.TestCase):
 
-  def setUp(self):
-    self._schema = cros_config_schema.ReadSchema()
+  @classmethod
+  def setUpClass(cls):
+    super().setUpClass()
+    cls._schema = _ReadSchema()
 
   def testDevices(self):
     config = {
@@ -415,6 +440,9 @@ chromeos:
               stylus-category: '{{$stylus-category}}'
 """
 
+_WHITELABEL_TRANSFORMED_JSON = cros_config_schema.TransformConfig(
+    WHITELABEL_CONFIG)
+
 INVALID_WHITELABEL_CONFIG = """
             # THIS WILL CAUSE THE FAILURE
             test-label: '{{$test-label}}'
@@ -425,7 +453,7 @@ class ValidateConfigTests(cros_test_lib.TestCase):
 
   def testBasicValidation(self):
     cros_config_schema.ValidateConfig(
-        cros_config_schema.TransformConfig(BASIC_CONFIG))
+        _BASIC_TRANSFORMED_JSON)
 
   def testIdentitiesNotUnique(self):
     config = """
@@ -477,9 +505,7 @@ chromeos:
     self.assertIn('Identities are not unique', str(ctx.exception))
 
   def testWhitelabelWithExternalStylus(self):
-    config = WHITELABEL_CONFIG
-    cros_config_schema.ValidateConfig(
-        cros_config_schema.TransformConfig(config))
+    cros_config_schema.ValidateConfig(_WHITELABEL_TRANSFORMED_JSON)
 
   def testWhitelabelWithOtherThanBrandChanges(self):
     config = WHITELABEL_CONFIG + INVALID_WHITELABEL_CONFIG
@@ -507,13 +533,10 @@ chromeos:
               has-base-magnetometer: false
               has-touchscreen: true
 """
-    try:
+    with self.assertRaises(cros_config_schema.ValidationError) as ctx:
       cros_config_schema.ValidateConfig(
           cros_config_schema.TransformConfig(config))
-    except cros_config_schema.ValidationError as err:
-      self.assertIn('must be boolean', err.__str__())
-    else:
-      self.fail('ValidationError not raised')
+    self.assertIn('must be boolean', str(ctx.exception))
 
   def testHardwarePropertiesBoolean(self):
     config = \
@@ -590,9 +613,7 @@ chromeos:
     with self.assertRaises(cros_config_schema.ValidationError) as ctx:
       cros_config_schema.ValidateConfig(json.dumps(config))
 
-    self.assertRegex(str(ctx.exception), re.compile(
-        'You may not use different fingerprint firmware RO versions on the '
-        'same board:.*'))
+    self.assertRegex(str(ctx.exception), _FINGERPRINT_RO_VERSIONS_RE)
 
   def testMultipleFingerprintFirmwareROVersionsValid(self):
     config = {
@@ -639,7 +660,7 @@ class FilterBuildElements(cros_test_lib.TestCase):
   def testBasicFilterBuildElements(self):
     json_dict = json.loads(
         cros_config_schema.FilterBuildElements(
-            cros_config_schema.TransformConfig(BASIC_CONFIG), ['/firmware']))
+            _BASIC_TRANSFORMED_JSON, ['/firmware']))
     self.assertNotIn('firmware', json_dict['chromeos']['configs'][0])
 
 
@@ -654,13 +675,24 @@ class GetValidSchemaProperties(cros_test_lib.TestCase):
     self.assertIn('count', schema_props['/camera'])
 
 
-class MainTests(cros_test_lib.TempDirTestCase):
+class MainTests(cros_test_lib.TestCase):
+
+  # The tests only write a couple of small files each, so share one temp
+  # directory across the class and empty it before each test.
+  @classmethod
+  def setUpClass(cls):
+    super().setUpClass()
+    cls._shared_tempdir = tempfile.mkdtemp(prefix='cros_config_schema.')
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls._shared_tempdir)
+    super().tearDownClass()
 
-  def _GetSchemaYaml(self):
-    with open(os.path.join(
-        this_dir, 'cros_config_schema.yaml')) as schema_stream:
-      schema_contents = schema_stream.read()
-      return yaml.load(schema_contents, Loader=yaml.SafeLoader)
+  def setUp(self):
+    super().setUp()
+    self.tempdir = self._shared_tempdir
+    osutils.EmptyDir(self.tempdir)
 
   def assertFileEqual(self, file_expected, file_actual, regen_cmd=''):
     self.assertTrue(os.path.isfile(file_expected),
@@ -671,21 +703,26 @@ class MainTests(cros_test_lib.TempDirTestCase):
                     'Actual file does not exist at path: {}'
                     .format(file_actual))
 
+    # Only build the unified diff when the bytewise check fails.
+    if filecmp.cmp(file_expected, file_actual, shallow=False):
+      return
+
     with open(file_expected, 'r') as expected, open(file_actual, 'r') as actual:
-      for line_num, (line_expected, line_actual) in \
-          enumerate(zip_longest(expected, actual)):
-        self.assertEqual(line_expected, line_actual, \
-           ('Files differ at line {0}\n'
-            'Expected: {1}\n'
-            'Actual  : {2}\n'
-            'Path of expected output file: {3}\n'
-            'Path of actual output file: {4}\n'
-            '{5}').format(line_num, repr(line_expected), repr(line_actual),
-                          file_expected, file_actual, regen_cmd))
+      diff = ''.join(difflib.unified_diff(
+          expected.readlines(), actual.readlines(),
+          fromfile=file_expected, tofile=file_actual))
+    # Text mode normalizes line endings, which the bytewise check does not.
+    if diff:
+      self.fail('Files differ:\n{0}\n{1}'.format(diff, regen_cmd))
 
   def assertMultilineStringEqual(self, str_expected, str_actual):
-    expected = str_expected.strip().split('\n')
-    actual = str_actual.strip().split('\n')
+    str_expected = str_expected.strip()
+    str_actual = str_actual.strip()
+    if str_expected == str_actual:
+      return
+
+    expected = str_expected.split('\n')
+    actual = str_actual.split('\n')
     for line_num, (line_expected, line_actual) in \
         enumerate(zip_longest(expected, actual)):
       self.assertEqual(line_expected, line_actual, \
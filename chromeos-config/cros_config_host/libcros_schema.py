@@ -10,11 +10,13 @@ Provides common cros_config and cros_config_test schema functions.
 from __future__ import print_function
 
 import collections
+import functools
 import json
 import os
 import re
 
-from jsonschema import validate  # pylint: disable=import-error
+from jsonschema import exceptions  # pylint: disable=import-error
+from jsonschema import validators  # pylint: disable=import-error
 import yaml  # pylint: disable=import-error
 
 
@@ -50,6 +52,24 @@ def FormatJson(config):
   return json.dumps(config, sort_keys=True, indent=2, separators=(',', ': '))
 
 
+@functools.lru_cache()
+def _GetSchemaValidator(schema):
+  """Returns a validator for the schema specified.
+
+  Parsing the schema and checking it against its meta-schema is much more
+  expensive than validating a config, so this is only done once per schema.
+
+  Args:
+    schema: Source schema used to verify configs.
+  """
+  schema_yaml = yaml.load(schema, Loader=yaml.SafeLoader)
+  schema_json_from_yaml = json.dumps(schema_yaml, sort_keys=True, indent=2)
+  schema_json = json.loads(schema_json_from_yaml)
+  validator_class = validators.validator_for(schema_json)
+  validator_class.check_schema(schema_json)
+  return validator_class(schema_json)
+
+
 def ValidateConfigSchema(schema, config):
   """Validates a transformed config against the schema specified.
 
@@ -60,10 +80,11 @@ def ValidateConfigSchema(schema, config):
     config: Config (transformed) that will be verified.
   """
   json_config = json.loads(config)
-  schema_yaml = yaml.load(schema, Loader=yaml.SafeLoader)
-  schema_json_from_yaml = json.dumps(schema_yaml, sort_keys=True, indent=2)
-  schema_json = json.loads(schema_json_from_yaml)
-  validate(json_config, schema_json)
+  # Raise the same error jsonschema.validate() would.
+  error = exceptions.best_match(
+      _GetSchemaValidator(schema).iter_errors(json_config))
+  if error is not None:
+    raise error
 
 
 def FindImports(config_file, includes):
@@ -6,8 +6,9 @@
 
 # pylint: disable=module-missing-docstring,class-missing-docstring
 
+import difflib
+import filecmp
 import os
-import subprocess
 
 import power_manager_prefs_gen_schema
 
@@ -23,14 +24,17 @@ class MainTest(cros_test_lib.TempDirTestCase):
     output_file = os.path.join(self.tempdir, 'output')
     power_manager_prefs_gen_schema.Main(output=output_file)
 
-    changed = subprocess.run(  # pylint: disable=subprocess-run-check
-        ['diff', SCHEMA_FILE, output_file]).returncode != 0
+    changed = not filecmp.cmp(SCHEMA_FILE, output_file, shallow=False)
 
     regen_cmd = ('To regenerate the schema, run:\n'
                  '\tpython3 -m cros_config_host.power_manager_prefs_gen_schema '
                  '-o %s ' % SCHEMA_FILE)
 
     if changed:
+      with open(SCHEMA_FILE) as expected, open(output_file) as actual:
+        print(''.join(difflib.unified_diff(
+            expected.readlines(), actual.readlines(),
+            fromfile=SCHEMA_FILE, tofile=output_file)))
       print(regen_cmd)
       self.fail('Powerd prefs schema does not match C++ prefs source.')
 
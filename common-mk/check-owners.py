@@ -26,9 +26,11 @@ from chromite.lib import cros_logging as logging
 
 def GetActiveProjects():
   """Return the list of active projects."""
-  # Look at all the paths (files & dirs) in the top of the git repo.  This way
-  # we ignore local directories devs created that aren't actually committed.
-  cmd = ['ls-tree', '--name-only', '-z', 'HEAD']
+  # Look at all the dirs in the top of the git repo.  This way we ignore local
+  # directories devs created that aren't actually committed.  Let git filter
+  # out the files since it already knows the type of each entry, rather than
+  # stat-ing every path ourselves.
+  cmd = ['ls-tree', '-d', '--name-only', '-z', 'HEAD']
   result = git.RunGit(TOP_DIR, cmd)
 
   # Split the output on NULs to avoid whitespace/etc... issues.
@@ -36,22 +38,35 @@ def GetActiveProjects():
 
   # ls-tree -z will include a trailing NUL on all entries, not just seperation,
   # so filter it out if found (in case ls-tree behavior changes on us).
-  for path in [Path(x) for x in paths if x]:
-    if (TOP_DIR / path).is_dir():
-      yield path
+  for x in paths:
+    if x:
+      yield Path(x)
 
 
 def CheckSubdirs():
   """Check the subdir OWNERS files exist."""
   ret = 0
-  for proj in GetActiveProjects():
+  projects = list(GetActiveProjects())
+
+  # Ask git for all the OWNERS files at once rather than checking each path.
+  cmd = ['ls-tree', '--name-only', '-z', 'HEAD', '--']
+  cmd += [str(proj / 'OWNERS') for proj in projects]
+  result = git.RunGit(TOP_DIR, cmd)
+  owners_files = set(result.stdout.split('\0'))
+
+  for proj in projects:
     path = TOP_DIR / proj / 'OWNERS'
-    if not path.exists():
+    # A committed OWNERS file may still have been removed locally, so treat
+    # that the same as one that isn't committed.
+    try:
+      if str(proj / 'OWNERS') not in owners_files:
+        raise FileNotFoundError(path)
+      data = path.read_text()
+    except FileNotFoundError:
       logging.error('*** Project "%s" needs an OWNERS file', proj)
       ret = 1
       continue
 
-    data = path.read_text()
     for i, line in enumerate(data.splitlines(), start=1):
       if line.strip().startswith('set noparent'):
         logging.error('*** %s:%i: Do not use "noparent" in top level projects',
@@ -30,6 +30,10 @@ class Util:
     md5 = hashlib.md5(name)
     return struct.unpack('>Q', md5.digest()[:8])[0]
 
+  @staticmethod
+  def uint64_literal(value):
+    return 'UINT64_C({})'.format(value)
+
   @staticmethod
   def event_name_hash(project_name, event_name):
     """Make the name hash for an event.
@@ -75,6 +79,8 @@ class ProjectInfo:
     self.name = Util.sanitize_name(project.name)
     self.namespace = Util.camel_to_snake(self.name)
     self.name_hash = Util.hash_name(self.name)
+    # Every event in the project includes the hash, so only format it once.
+    self.name_hash_literal = Util.uint64_literal(self.name_hash)
 
     if project.id == 'uma':
       self.id_type = 'kUmaId'
@@ -90,6 +96,7 @@ class EventInfo:
   def __init__(self, event, project_info):
     self.name = Util.sanitize_name(event.name)
     self.name_hash = Util.event_name_hash(project_info.name, self.name)
+    self.name_hash_literal = Util.uint64_literal(self.name_hash)
 
 
 class MetricInfo:
@@ -98,6 +105,7 @@ class MetricInfo:
   def __init__(self, metric):
     self.name = Util.sanitize_name(metric.name)
     self.hash = Util.hash_name(metric.name)
+    self.hash_literal = Util.uint64_literal(self.hash)
 
     if metric.type == 'hmac-string':
       self.type = 'std::string&'
@@ -132,7 +140,7 @@ class Template:
                            for p in self.model.projects)
 
     project_names = sorted([p.name for p in self.model.projects])
-    project_hashes_list = ['UINT64_C({})'.format(Util.hash_name(n))
+    project_hashes_list = [Util.uint64_literal(Util.hash_name(n))
                            for n in project_names]
     project_hashes_literal = '{' + ', '.join(project_hashes_list) + '}'
 
@@ -49,8 +49,8 @@ class {event.name} final : public ::metrics::structured::EventBase {{
   {event.name}();
   ~{event.name}() override;
 
-  static constexpr uint64_t kEventNameHash = UINT64_C({event.name_hash});
-  static constexpr uint64_t kProjectNameHash = UINT64_C({project.name_hash});
+  static constexpr uint64_t kEventNameHash = {event.name_hash_literal};
+  static constexpr uint64_t kProjectNameHash = {project.name_hash_literal};
   static constexpr IdentifierType kIdType = IdentifierType::{project.id_type};
 
 {metric_code}\
@@ -60,7 +60,7 @@ class {event.name} final : public ::metrics::structured::EventBase {{
 
 
 HEADER_METRIC_TEMPLATE = """\
-  static constexpr uint64_t k{metric.name}NameHash = UINT64_C({metric.hash});
+  static constexpr uint64_t k{metric.name}NameHash = {metric.hash_literal};
   {event.name}& Set{metric.name}(const {metric.type} value);
 
 """